@@ -1,70 +1,132 @@
 from fastapi import FastAPI, Depends, HTTPException, Form, Request, status
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from pydantic import BaseModel, EmailStr, Field
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy import bindparam, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import EmailStr, TypeAdapter, ValidationError
 from passlib.context import CryptContext
-from typing import List, Optional, Dict
-from datetime import datetime
+from anyio import to_thread
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+from contextlib import asynccontextmanager
+import os
+import secrets
+
+import jwt
 
 import models
+import schemas
 from database import get_db, engine
 
-# Create the database tables
-models.Base.metadata.create_all(bind=engine)
+PRODUCTION = os.getenv("APP_ENV") == "production"
 
-app = FastAPI(title="InfoHub API", description="API для зберігання та керування інформацією")
-templates = Jinja2Templates(directory="templates")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the database tables and load the password hashing backend before serving requests."""
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+        await conn.run_sync(models.upgrade_schema)
+    # Resolve the default (argon2) backend up front so the first /register or /token doesn't pay for it;
+    # legacy bcrypt stays lazy so a broken bcrypt install can't stop the app from starting
+    pwd_context.handler().get_backend()
+    yield
 
 
-class User(BaseModel):
-    username: str
-    email: EmailStr
-    is_active: bool = True
+app = FastAPI(title="InfoHub API", description="API для зберігання та керування інформацією", default_response_class=ORJSONResponse, lifespan=lifespan)
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
+templates = Jinja2Templates(directory="templates")
+# In production templates don't change at runtime, so skip the per-render mtime checks
+templates.env.auto_reload = not PRODUCTION
+# No directory argument: Jinja uses a per-user 0700 temp dir and checks its ownership
+templates.env.bytecode_cache = FileSystemBytecodeCache()
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+SECRET_KEY = os.getenv("SECRET_KEY")
+if not SECRET_KEY:
+    if PRODUCTION:
+        raise RuntimeError("SECRET_KEY must be set when APP_ENV=production")
+    # Development only: a per-process key, so tokens don't survive restarts or span workers
+    SECRET_KEY = secrets.token_urlsafe(32)
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-class Article(BaseModel):
-    title: str
-    content: str
-    tags: List[str] = Field(default_factory=list)
-    published_at: Optional[datetime] = Field(default_factory=datetime.now)
+PAGE_SIZE = 50
 
+# Built once so the hot login lookup always hits the compiled-statement cache
+USER_BY_USERNAME = select(models.User).where(models.User.username == bindparam("username")).limit(1)
 
-class Author(BaseModel):
-    name: str
-    email: EmailStr
-    bio: Optional[str] = None
+# Id of the author new articles are attributed to; reset whenever authors change
+_default_author_id_cache: Optional[int] = None
 
+# Built once and reused to validate form emails without constructing a whole model
+_email_adapter = TypeAdapter(EmailStr)
 
-class Comment(BaseModel):
-    author_name: str
-    content: str
-    created_at: Optional[datetime] = Field(default_factory=datetime.now)
+# argon2 (argon2-cffi) is the default; bcrypt stays so existing hashes still verify
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__memory_cost=19456,
+    argon2__time_cost=2,
+    argon2__parallelism=1,
+)
 
 
 def hash_password(password: str) -> str:
-    """Hash a password using bcrypt."""
+    """Hash a password using argon2id."""
     return pwd_context.hash(password)
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    """Get the current user based on the token."""
-    user = db.query(models.User).filter(models.User.username == token).first()
-    if user is None:
+async def _default_author_id(db: AsyncSession) -> Optional[int]:
+    """Return the id of the author new articles are attributed to."""
+    global _default_author_id_cache
+    if _default_author_id_cache is None:
+        result = await db.execute(select(models.Author.id).order_by(models.Author.id).limit(1))
+        _default_author_id_cache = result.scalar_one_or_none()
+    return _default_author_id_cache
+
+
+def _clear_default_author_id() -> None:
+    """Forget the cached default author id."""
+    global _default_author_id_cache
+    _default_author_id_cache = None
+
+
+def validate_email(email: str) -> str:
+    """Validate an email address submitted through a form."""
+    try:
+        return _email_adapter.validate_python(email)
+    except ValidationError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некоректна електронна пошта")
+
+
+def create_access_token(user: models.User) -> str:
+    """Create a signed JWT for the given user."""
+    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    return jwt.encode({"sub": user.username, "email": user.email, "exp": expire}, SECRET_KEY, algorithm=ALGORITHM)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> schemas.User:
+    """Get the current user from the token claims without hitting the database."""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["sub", "email", "exp"]})
+    except jwt.PyJWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
-    return user
+    # Claims come from a token we signed, so skip re-validating them
+    return schemas.User.model_construct(username=payload["sub"], email=payload["email"])
 
 
 @app.post("/register", response_class=HTMLResponse)
-async def register_user(request: Request, username: str = Form(...), email: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
+async def register_user(request: Request, username: str = Form(...), email: str = Form(...), password: str = Form(...), db: AsyncSession = Depends(get_db)):
     """Register a new user."""
-    hashed_password = hash_password(password)
+    email = validate_email(email)
+    hashed_password = await to_thread.run_sync(hash_password, password)
     new_user = models.User(username=username, email=email, password=hashed_password)
     db.add(new_user)
-    db.commit()
+    await db.commit()
     return templates.TemplateResponse("register_success.html", {"request": request, "username": username, "title": "Успішна реєстрація"})
 
 
@@ -81,12 +143,20 @@ async def show_login_form(request: Request):
 
 
 @app.post("/token")
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """Log in a user and return a token."""
-    user = db.query(models.User).filter(models.User.username == form_data.username).first()
-    if not user or not pwd_context.verify(form_data.password, user.password):
+    result = await db.execute(USER_BY_USERNAME, {"username": form_data.username})
+    user = result.scalar_one_or_none()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Неправильне ім'я користувача або пароль")
+    verified, new_hash = await to_thread.run_sync(pwd_context.verify_and_update, form_data.password, user.password)
+    if not verified:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Неправильне ім'я користувача або пароль")
-    return {"access_token": user.username, "token_type": "bearer"}
+    if new_hash:
+        # Rehash legacy bcrypt passwords with argon2id on successful login
+        user.password = new_hash
+        await db.commit()
+    return {"access_token": create_access_token(user), "token_type": "bearer"}
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -102,19 +172,26 @@ async def show_add_author_form(request: Request):
 
 
 @app.post("/authors", response_class=HTMLResponse)
-async def create_author(request: Request, name: str = Form(...), email: str = Form(...), bio: str = Form(None), db: Session = Depends(get_db)):
+async def create_author(request: Request, name: str = Form(...), email: str = Form(...), bio: str = Form(None), db: AsyncSession = Depends(get_db)):
     """Create a new author."""
-    author = models.Author(name=name, email=email, bio=bio)
-    db.add(author)
-    db.commit()
+    email = validate_email(email)
+    await db.execute(insert(models.Author).values(name=name, email=email, bio=bio))
+    await db.commit()
+    _clear_default_author_id()
     return RedirectResponse(url="/authors", status_code=status.HTTP_303_SEE_OTHER)
 
 
 @app.get("/authors", response_class=HTMLResponse)
-async def get_authors(request: Request, db: Session = Depends(get_db)):
-    """Get the list of authors."""
-    authors = db.query(models.Author).all()
-    return templates.TemplateResponse("authors.html", {"request": request, "authors": authors})
+async def get_authors(request: Request, cursor: Optional[int] = None, db: AsyncSession = Depends(get_db)):
+    """Get a page of authors, newest first, starting below the given cursor id."""
+    stmt = select(models.Author).order_by(models.Author.id.desc()).limit(PAGE_SIZE + 1)
+    if cursor is not None:
+        stmt = stmt.where(models.Author.id < cursor)
+    # One extra row tells whether another page exists
+    authors = (await db.execute(stmt)).scalars().all()
+    next_cursor = authors[PAGE_SIZE - 1].id if len(authors) > PAGE_SIZE else None
+    authors = authors[:PAGE_SIZE]
+    return templates.TemplateResponse("authors.html", {"request": request, "authors": authors, "next_cursor": next_cursor})
 
 
 @app.get("/add_article", response_class=HTMLResponse)
@@ -124,44 +201,51 @@ async def show_add_article_form(request: Request):
 
 
 @app.post("/articles", response_class=HTMLResponse)
-async def create_article(request: Request, title: str = Form(...), content: str = Form(...), tags: str = Form(""), db: Session = Depends(get_db)):
+async def create_article(request: Request, title: str = Form(...), content: str = Form(...), tags: str = Form(""), db: AsyncSession = Depends(get_db)):
     """Create a new article."""
-    author = db.query(models.Author).first()  # Update logic for selecting the correct author
-    article = models.Article(title=title, content=content, tags=tags.split(","), author_id=author.id)
-    db.add(article)
-    db.commit()
+    author_id = await _default_author_id(db)  # Update logic for selecting the correct author
+    if author_id is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Спочатку додайте автора")
+    await db.execute(insert(models.Article).values(title=title, content=content, tags=[t.strip() for t in tags.split(",") if t.strip()], author_id=author_id))
+    await db.commit()
     return RedirectResponse(url="/articles", status_code=status.HTTP_303_SEE_OTHER)
 
 
 @app.get("/articles", response_class=HTMLResponse)
-async def get_articles(request: Request, db: Session = Depends(get_db)):
-    """Get the list of articles."""
-    articles = db.query(models.Article).all()
-    return templates.TemplateResponse("articles.html", {"request": request, "articles": articles})
+async def get_articles(request: Request, cursor: Optional[int] = None, db: AsyncSession = Depends(get_db)):
+    """Get a page of articles, newest first, starting below the given cursor id."""
+    stmt = select(models.Article).order_by(models.Article.id.desc()).limit(PAGE_SIZE + 1)
+    if cursor is not None:
+        stmt = stmt.where(models.Article.id < cursor)
+    # One extra row tells whether another page exists
+    articles = (await db.execute(stmt)).scalars().all()
+    next_cursor = articles[PAGE_SIZE - 1].id if len(articles) > PAGE_SIZE else None
+    articles = articles[:PAGE_SIZE]
+    return templates.TemplateResponse("articles.html", {"request": request, "articles": articles, "next_cursor": next_cursor})
 
 
 @app.get("/articles/{article_id}", response_class=HTMLResponse)
-async def read_article(request: Request, article_id: int, db: Session = Depends(get_db)):
+async def read_article(request: Request, article_id: int, db: AsyncSession = Depends(get_db)):
     """Read a specific article."""
-    article = db.query(models.Article).filter(models.Article.id == article_id).first()
-    comments = db.query(models.Comment).filter(models.Comment.article_id == article_id).all()
-    return templates.TemplateResponse("article_detail.html", {"request": request, "article": article, "comments": comments})
+    result = await db.execute(select(models.Article).where(models.Article.id == article_id))
+    article = result.scalar_one_or_none()
+    if article is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Статтю не знайдено")
+    return templates.TemplateResponse("article_detail.html", {"request": request, "article": article})
 
 
 @app.post("/articles/{article_id}/comment", response_class=HTMLResponse)
-async def create_comment(request: Request, article_id: int, author_name: str = Form(...), content: str = Form(...), db: Session = Depends(get_db)):
+async def create_comment(request: Request, article_id: int, author_name: str = Form(...), content: str = Form(...), db: AsyncSession = Depends(get_db)):
     """Add a comment to an article."""
-    comment = models.Comment(article_id=article_id, author_name=author_name, content=content)
-    db.add(comment)
-    db.commit()
+    await db.execute(insert(models.Comment).values(article_id=article_id, author_name=author_name, content=content))
+    await db.commit()
     return RedirectResponse(url=f"/articles/{article_id}", status_code=status.HTTP_303_SEE_OTHER)
 
 
 @app.get("/profile", response_class=HTMLResponse)
-async def read_profile(request: Request, current_user: User = Depends(get_current_user)):
+async def read_profile(request: Request, current_user: schemas.User = Depends(get_current_user)):
     """Display the profile of the current user."""
-    user = db.query(models.User).filter(models.User.username == current_user.username).first()
-    return templates.TemplateResponse("profile.html", {"request": request, "user": user})
+    return templates.TemplateResponse("profile.html", {"request": request, "user": current_user})
 
 
 if __name__ == "__main__":
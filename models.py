@@ -1,14 +1,19 @@
 # models.py
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index, JSON, func, inspect, text
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
 from database import Base
 
 
 class User(Base):
     __tablename__ = "users"
+    # The unique username index doubles as a covering index so lookups are index-only scans on Postgres
+    __table_args__ = (
+        Index("ix_users_username", "username", unique=True, postgresql_include=["password", "email", "id"]),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    username = Column(String, unique=True, index=True)
+    username = Column(String)
     email = Column(String, unique=True, index=True)
     password = Column(String)
 
@@ -17,11 +22,16 @@ class User(Base):
 
 class Article(Base):
     __tablename__ = "articles"
+    # GIN index for tag containment searches on Postgres
+    __table_args__ = (
+        Index("ix_articles_tags_gin", "tags", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String)
     content = Column(Text)
-    published_at = Column(DateTime)
+    published_at = Column(DateTime(timezone=True), server_default=func.now())
+    tags = Column(ARRAY(Text).with_variant(JSON(), "sqlite"), default=list)  # JSON list on SQLite
     author_id = Column(Integer, ForeignKey("users.id"))
 
     author = relationship("User", back_populates="articles")
@@ -43,7 +53,35 @@ class Comment(Base):
     id = Column(Integer, primary_key=True, index=True)
     author_name = Column(String)
     content = Column(Text)
-    created_at = Column(DateTime)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
     article_id = Column(Integer, ForeignKey("articles.id"))
 
     article = relationship("Article", back_populates="comments")
+
+
+def upgrade_schema(connection):
+    """Bring tables that already existed up to date; create_all only creates missing tables."""
+    inspector = inspect(connection)
+    columns = {column["name"] for column in inspector.get_columns("articles")}
+    if "tags" not in columns:
+        tags_type = Article.__table__.c.tags.type.compile(dialect=connection.dialect)
+        connection.execute(text(f"ALTER TABLE articles ADD COLUMN tags {tags_type}"))
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("CREATE INDEX ix_articles_tags_gin ON articles USING gin (tags)"))
+    if connection.dialect.name == "postgresql":
+        indexes = {index["name"]: index for index in inspector.get_indexes("users")}
+        username_index = indexes.get("ix_users_username")
+        if username_index is None or not username_index.get("dialect_options", {}).get("postgresql_include"):
+            connection.execute(text(
+                "CREATE UNIQUE INDEX ix_users_username_new ON users (username) INCLUDE (password, email, id)"
+            ))
+            if username_index is not None:
+                connection.execute(text("DROP INDEX ix_users_username"))
+            connection.execute(text("ALTER INDEX ix_users_username_new RENAME TO ix_users_username"))
+        # SQLite can't alter column defaults in place; older SQLite tables keep NULL timestamps until rebuilt
+        for table, column in (("articles", "published_at"), ("comments", "created_at")):
+            reflected = next(c for c in inspector.get_columns(table) if c["name"] == column)
+            if not reflected["type"].timezone:
+                connection.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE TIMESTAMP WITH TIME ZONE"))
+            if reflected["default"] is None:
+                connection.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT now()"))
@@ -17,12 +17,12 @@ class Article(BaseModel):
     content: str
     author: Author
     tags: Optional[List[str]] = Field(default_factory=list)
-    published_at: Optional[datetime] = Field(default_factory=datetime.now)
+    published_at: Optional[datetime] = None
 
 class Comment(BaseModel):
     author_name: str
     content: str
-    created_at: Optional[datetime] = Field(default_factory=datetime.now)
+    created_at: Optional[datetime] = None
 
 class ArticleRequest(BaseModel):
     keywords: List[str]